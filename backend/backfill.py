@@ -1,38 +1,52 @@
 """
-One-off backfill for the region->strategy migration. Run ONCE against the prod DB
-AFTER the new code is deployed:
+Rebuild daily momentum history for any strategy from 5y of prices.
 
-    DATABASE_URL='<prod-postgres-url>' python backend/backfill.py            # dry run (prints plan)
-    DATABASE_URL='<prod-postgres-url>' python backend/backfill.py --commit   # actually write
+    python backend/backfill.py                                   # dry run, every strategy
+    python backend/backfill.py --strategy gem-eu --commit        # write one strategy
+    python backend/backfill.py --from 2023-01-01 --to 2023-12-31 --commit
+    DATABASE_URL='<prod-postgres-url>' python backend/backfill.py --commit
 
 What it does:
-  1. Renames legacy rows: region 'US' -> 'gem-us', 'EU' -> 'gem-eu' (same instruments/slots).
-  2. Recomputes the `signal` of those rows with the canonical rule from their stored
-     slot momenta (legacy rows used the pre-canonical variant).
-  3. Backfills `max-gem-eu` daily history from 5y of prices (never tracked before):
-     computes 12-month (252 trading day) momentum for every trading day and the argmax signal.
+  1. Renames legacy rows: region 'US' -> 'gem-us', 'EU' -> 'gem-eu' (same instruments/slots),
+     and recomputes their `signal` with the canonical rule from the stored slot momenta.
+  2. Fetches each ticker ONCE (shared across strategies), then computes 12-month
+     (252 trading day) momentum + signal for every trading day in [--from, --to].
+     Work is split into (strategy, date chunk) units run on a process pool.
+  3. Writes chunk by chunk, one transaction per chunk, touching only rows that are
+     missing or differ from what's stored. After each committed chunk a checkpoint
+     (keyed by target database) is saved, so an interrupted run picks up where it
+     stopped (--restart to ignore it).
 
-Idempotent: safe to re-run. Step 3 clears existing max-gem-eu rows first.
+Idempotent: safe to re-run; an up-to-date range writes nothing. Rows are matched by
+calendar day: the earliest row of a computed day is corrected in place and any later
+rows that day (e.g. the cron's intraday row) are deleted, so each day ends up with one row.
 """
-import sys
-from bisect import bisect_right
-from datetime import datetime
+import argparse
+import json
+import math
+import os
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
 
-from sqlmodel import Session, select, delete
+from sqlmodel import Session, select
 
 try:
     from .momentum import STRATEGIES, compute_signal, fetch_ticker_data
-    from .database import engine, MomentumHistory
+    from .database import write_engine, MomentumHistory
 except ImportError:
     from momentum import STRATEGIES, compute_signal, fetch_ticker_data
-    from database import engine, MomentumHistory
+    from database import write_engine, MomentumHistory
 
 LOOKBACK = 252  # trading days, matches fetch_momentum_data
-COMMIT = "--commit" in sys.argv
+CHECKPOINT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".backfill-checkpoint.json")
 
 # Legacy region id -> new strategy id (same tickers, same slot order).
 RENAME = {"US": "gem-us", "EU": "gem-eu"}
 
+# The 4 generic slot columns, in asset order (see database.py).
+SLOTS = ("spy_mom", "veu_mom", "bnd_mom", "tbill_mom")
+
 
 def _mom_from_slots(row, assets):
     """Rebuild a {ticker: momentum} map from the 4 fixed slot columns."""
@@ -57,12 +71,13 @@ def rename_and_recompute(session):
         ).all()
 
         for row in rows:
+            renamed = row.region == old_id
             row.region = new_id
             mom = _mom_from_slots(row, config["assets"])
             if any(v is None for v in mom.values()):
                 continue  # can't recompute canonical without all four (esp. threshold)
             new_signal = compute_signal(config, mom)
-            if row.region != old_id or new_signal != row.signal:
+            if renamed or new_signal != row.signal:
                 updated += 1
             row.signal = new_signal
             session.add(row)
@@ -70,81 +85,287 @@ def rename_and_recompute(session):
     return updated
 
 
-def backfill_max_gem(session):
-    sid = "max-gem-eu"
-    config = STRATEGIES[sid]
-    assets = config["assets"]
+# --- Price data (fetched once, shared by every worker) -----------------------
+
+def load_series(tickers):
+    """
+    Fetch every ticker once and return {ticker: (dates, prices)}, both ascending.
+    Tickers with no data are left out. Fetches are network-bound, so a thread pool.
+    """
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        fetched = dict(zip(tickers, pool.map(fetch_ticker_data, tickers)))
 
-    # Per-ticker ascending (datetime, price) series.
     series = {}
-    for ticker in assets:
-        data = fetch_ticker_data(ticker)
+    for ticker, data in fetched.items():
         if not data:
-            print(f"  ! no data for {ticker}; aborting max-gem-eu backfill")
-            return 0
-        series[ticker] = sorted(
-            ((datetime.fromtimestamp(d["date"]), d["price"]) for d in data),
-            key=lambda x: x[0],
-        )
+            continue
+        points = sorted((datetime.fromtimestamp(d["date"]), d["price"]) for d in data)
+        series[ticker] = ([d for d, _ in points], [p for _, p in points])
+    return series
+
+
+# Set once per worker process by the pool initializer, so the price data is shipped
+# to each worker once rather than with every unit of work.
+_SERIES = {}
 
-    ref = series[assets[0]]
-    ref_dates = [d for d, _ in ref]
+
+def _init_worker(series):
+    global _SERIES
+    _SERIES = series
+
+
+def compute_chunk(sid, start, end):
+    """
+    Compute daily rows for one strategy over [start, end] (inclusive days) from the
+    shared series. Returns a list of plain dicts (cheap to send back from a worker).
+    """
+    config = STRATEGIES[sid]
+    assets = config["assets"]
+    ref_dates = _SERIES[assets[0]][0]
+
+    lo = bisect_left(ref_dates, datetime.combine(start, datetime.min.time()))
+    hi = bisect_right(ref_dates, datetime.combine(end, datetime.max.time()))
 
     rows = []
-    for idx in range(len(ref_dates)):
-        sample = ref_dates[idx]
+    for sample in ref_dates[lo:hi]:
         mom = {}
-        ok = True
         for ticker in assets:
-            s = series[ticker]
-            ts = [d for d, _ in s]
-            pos = bisect_right(ts, sample) - 1  # last point on/before the sample date
+            dates, prices = _SERIES[ticker]
+            pos = bisect_right(dates, sample) - 1  # last point on/before the sample date
             if pos < LOOKBACK:
-                ok = False
-                break
-            cur = s[pos][1]
-            past = s[pos - LOOKBACK][1]
-            mom[ticker] = 0.0 if past == 0 else (cur / past) - 1.0
-        if not ok:
-            continue  # not enough history yet at this date
-
-        rows.append(
-            MomentumHistory(
-                date=sample,
-                region=sid,
-                spy_mom=mom[assets[0]],
-                veu_mom=mom[assets[1]],
-                bnd_mom=mom[assets[2]],
-                tbill_mom=mom[assets[3]],
-                signal=compute_signal(config, mom),
+                break  # not enough history yet at this date
+            past = prices[pos - LOOKBACK]
+            mom[ticker] = 0.0 if past == 0 else (prices[pos] / past) - 1.0
+        else:
+            row = {"date": sample, "signal": compute_signal(config, mom)}
+            for slot, ticker in zip(SLOTS, assets):
+                row[slot] = mom[ticker]
+            rows.append(row)
+    return rows
+
+
+def _compute_unit(unit):
+    sid, start, end = unit
+    return unit, compute_chunk(sid, start, end)
+
+
+def date_chunks(start, end, chunk_days):
+    """Split [start, end] into consecutive inclusive (first, last) day ranges."""
+    chunks = []
+    while start <= end:
+        last = min(start + timedelta(days=chunk_days - 1), end)
+        chunks.append((start, last))
+        start = last + timedelta(days=1)
+    return chunks
+
+
+# --- Checkpointing -----------------------------------------------------------
+
+def load_checkpoint():
+    if not os.path.exists(CHECKPOINT_FILE):
+        return {}
+    with open(CHECKPOINT_FILE) as f:
+        return json.load(f)
+
+
+def save_checkpoint(checkpoint):
+    tmp = CHECKPOINT_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp, CHECKPOINT_FILE)  # atomic, so a crash never leaves a torn file
+
+
+def _range_key(start, end):
+    # The target database plus the range as requested (None = default), so resuming
+    # tomorrow without --to still matches a run started today, but a checkpoint from a
+    # prod run never makes a local/staging run skip chunks.
+    return {
+        "database": write_engine.url.render_as_string(hide_password=True),
+        "from": start.isoformat() if start else None,
+        "to": end.isoformat() if end else None,
+    }
+
+
+def _resume_from(checkpoint, sid, key):
+    """Last committed day for this strategy, if the checkpoint is for the same database and range."""
+    entry = checkpoint.get(sid)
+    if entry and all(entry.get(k) == v for k, v in key.items()):
+        return datetime.strptime(entry["done_through"], "%Y-%m-%d").date()
+    return None
+
+
+# --- Writing -----------------------------------------------------------------
+
+def _differs(row, computed):
+    if row.signal != computed["signal"]:
+        return True
+    for slot in SLOTS:
+        old, new = getattr(row, slot), computed[slot]
+        if old is None or new is None:
+            if old is not new:
+                return True
+        elif not math.isclose(old, new, rel_tol=1e-9, abs_tol=1e-12):
+            return True
+    return False
+
+
+def write_chunk(session, sid, start, end, computed):
+    """
+    Upsert computed rows for [start, end] by calendar day. Only missing or changed
+    rows are written; extra rows on a computed day are deleted, since any disagreeing
+    duplicate would read as a fake allocation change. Returns (inserted, updated, deleted).
+    """
+    existing = session.exec(
+        select(MomentumHistory)
+        .where(MomentumHistory.region == sid)
+        .where(MomentumHistory.date >= datetime.combine(start, datetime.min.time()))
+        .where(MomentumHistory.date <= datetime.combine(end, datetime.max.time()))
+        .order_by(MomentumHistory.date)
+    ).all()
+    by_day = {}
+    for row in existing:
+        by_day.setdefault(row.date.date(), []).append(row)  # earliest row first
+
+    inserted = updated = deleted = 0
+    for values in computed:
+        rows = by_day.get(values["date"].date())
+        if not rows:
+            session.add(MomentumHistory(region=sid, **values))
+            inserted += 1
+            continue
+        row, extras = rows[0], rows[1:]
+        if _differs(row, values):
+            for key in ("signal",) + SLOTS:
+                setattr(row, key, values[key])
+            session.add(row)
+            updated += 1
+        for extra in extras:
+            session.delete(extra)
+            deleted += 1
+    return inserted, updated, deleted
+
+
+def backfill(session, strategies, start, end, commit, workers, chunk_days, restart):
+    """
+    Step 2 on the caller's session. A dry run never commits or rolls back here, so it
+    sees step 1's uncommitted renames and plans exactly what --commit would write.
+    """
+    tickers = sorted({t for sid in strategies for t in STRATEGIES[sid]["assets"]})
+    series = load_series(tickers)
+
+    runnable = []
+    for sid in strategies:
+        missing = [t for t in STRATEGIES[sid]["assets"] if t not in series]
+        if missing:
+            print(f"  ! no data for {', '.join(missing)}; skipping {sid}")
+        else:
+            runnable.append(sid)
+    if not runnable:
+        return {}
+
+    key = _range_key(start, end)
+    # Default range: everything the price data can support.
+    if start is None:
+        start = min(series[t][0][0] for t in tickers if t in series).date()
+    if end is None:
+        end = datetime.now().date()
+
+    checkpoint = {} if restart else load_checkpoint()
+    units = []
+    for sid in runnable:
+        done_through = _resume_from(checkpoint, sid, key) if commit else None
+        if done_through:
+            print(f"  {sid}: resuming after {done_through.isoformat()}")
+        first = start if done_through is None else done_through + timedelta(days=1)
+        units += [(sid, a, b) for a, b in date_chunks(first, end, chunk_days)]
+
+    totals = {sid: [0, 0, 0, 0] for sid in runnable}  # computed, inserted, updated, deleted
+    # map() yields in submission order, so each strategy's chunks arrive in date order
+    # and the checkpoint always marks a contiguous committed prefix.
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(series,)) as pool:
+        for (sid, first, last), computed in pool.map(_compute_unit, units):
+            inserted, updated, deleted = write_chunk(session, sid, first, last, computed)
+            if commit:
+                session.commit()
+                checkpoint[sid] = {**key, "done_through": last.isoformat()}
+                save_checkpoint(checkpoint)
+            t = totals[sid]
+            t[0] += len(computed)
+            t[1] += inserted
+            t[2] += updated
+            t[3] += deleted
+            print(
+                f"  {sid} {first}..{last}: {len(computed)} days, "
+                f"+{inserted} new, ~{updated} changed, -{deleted} duplicates"
             )
-        )
 
-    existing = session.exec(select(MomentumHistory).where(MomentumHistory.region == sid)).all()
-    print(f"  {sid}: {len(existing)} existing rows to clear, {len(rows)} daily rows to insert")
-    if COMMIT:
-        session.exec(delete(MomentumHistory).where(MomentumHistory.region == sid))
-        for r in rows:
-            session.add(r)
-    return len(rows)
+    if commit:
+        # Finished strategies start fresh next time; re-runs are cheap thanks to the diff.
+        for sid in runnable:
+            checkpoint.pop(sid, None)
+        if checkpoint:
+            save_checkpoint(checkpoint)
+        elif os.path.exists(CHECKPOINT_FILE):
+            os.remove(CHECKPOINT_FILE)
+    return totals
+
+
+def _parse_day(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild daily momentum history.")
+    parser.add_argument("--strategy", default="all", choices=["all", *STRATEGIES],
+                        help="strategy id to rebuild, or 'all' (default)")
+    parser.add_argument("--from", dest="start", type=_parse_day,
+                        help="first day YYYY-MM-DD (default: earliest with price data)")
+    parser.add_argument("--to", dest="end", type=_parse_day,
+                        help="last day YYYY-MM-DD (default: today)")
+    parser.add_argument("--commit", action="store_true",
+                        help="actually write (default is a dry run)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="compute processes (default: CPU count)")
+    parser.add_argument("--chunk-days", type=int, default=90,
+                        help="days per transaction/checkpoint (default: 90)")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore any saved checkpoint and start from --from")
+    args = parser.parse_args(argv)
+    if args.start and args.end and args.start > args.end:
+        parser.error("--from must be on or before --to")
+    if args.chunk_days < 1:
+        parser.error("--chunk-days must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    return args
+
 
+def main(argv=None):
+    args = parse_args(argv)
+    strategies = list(STRATEGIES) if args.strategy == "all" else [args.strategy]
 
-def main():
-    print(f"=== Backfill ({'COMMIT' if COMMIT else 'DRY RUN — pass --commit to write'}) ===")
-    with Session(engine) as session:
+    print(f"=== Backfill ({'COMMIT' if args.commit else 'DRY RUN — pass --commit to write'}) ===")
+    # One session for both steps: a dry run rolls back once at the very end, so step 2
+    # plans against step 1's renamed rows just like the real run does.
+    with Session(write_engine) as session:
         print("1/2 Rename + recompute canonical signals:")
         changed = rename_and_recompute(session)
         print(f"     -> {changed} rows changed")
-
-        print("2/2 Backfill max-gem-eu daily history:")
-        inserted = backfill_max_gem(session)
-
-        if COMMIT:
+        if args.commit:
             session.commit()
-            print(f"Committed. max-gem-eu rows inserted: {inserted}")
-        else:
+
+        print(f"2/2 Backfill daily history for {', '.join(strategies)}:")
+        totals = backfill(
+            session, strategies, args.start, args.end, args.commit,
+            args.workers, args.chunk_days, args.restart,
+        )
+        if not args.commit:
             session.rollback()
-            print("Dry run — nothing written.")
+
+    for sid, (computed, inserted, updated, deleted) in totals.items():
+        print(f"     -> {sid}: {computed} days, {inserted} inserted, {updated} updated, {deleted} deleted")
+
+    print("Committed." if args.commit else "Dry run — nothing written.")
 
 
 if __name__ == "__main__":
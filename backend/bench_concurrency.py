@@ -0,0 +1,131 @@
+"""
+Reader-vs-writer concurrency benchmark for the SQLite engine setup.
+
+    python backend/bench_concurrency.py
+    python backend/bench_concurrency.py --readers 8 --rows 100000 --hold 2
+
+Seeds a throwaway SQLite file, then runs a long write transaction (the cron /
+backfill path) while reader threads hammer the /api/history query. Runs twice:
+  - legacy: one default engine, rollback journal (what database.py used to do)
+  - tuned:  make_engine() write + read engines (WAL, synchronous=NORMAL)
+and reports reader latency and lock errors while the write is in flight.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from sqlmodel import SQLModel, Session, create_engine, select
+
+try:
+    from .database import MomentumHistory, make_engine
+except ImportError:
+    from database import MomentumHistory, make_engine
+
+
+def _rows(n, region):
+    return [
+        {
+            "date": datetime(2020, 1, 1) + timedelta(minutes=i),
+            "region": region,
+            "spy_mom": 0.01 * (i % 7),
+            "veu_mom": 0.02,
+            "bnd_mom": 0.03,
+            "tbill_mom": 0.01,
+            "signal": "SPY",
+        }
+        for i in range(n)
+    ]
+
+
+def seed(engine, rows):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(insert(MomentumHistory), _rows(rows, "gem-us"))
+        session.commit()
+
+
+def writer(engine, rows, hold, started, done):
+    """One big transaction: insert, keep it open `hold` seconds, then commit."""
+    with Session(engine) as session:
+        started.set()
+        session.execute(insert(MomentumHistory), _rows(rows, "max-gem-eu"))
+        time.sleep(hold)
+        session.commit()
+    done.set()
+
+
+def reader(engine, started, done, latencies, errors):
+    started.wait()
+    query = (
+        select(MomentumHistory)
+        .where(MomentumHistory.region == "gem-us")
+        .order_by(MomentumHistory.date.desc())
+        .limit(100)
+    )
+    while not done.is_set():
+        t0 = time.perf_counter()
+        try:
+            with Session(engine) as session:
+                session.exec(query).all()
+            latencies.append(time.perf_counter() - t0)
+        except OperationalError:
+            errors.append(time.perf_counter() - t0)
+
+
+def run(label, write_engine, read_engine, args):
+    seed(write_engine, args.seed_rows)
+    started, done = threading.Event(), threading.Event()
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(target=reader, args=(read_engine, started, done, latencies, errors))
+        for _ in range(args.readers)
+    ]
+    for t in threads:
+        t.start()
+    t0 = time.perf_counter()
+    writer(write_engine, args.rows, args.hold, started, done)
+    write_s = time.perf_counter() - t0
+    for t in threads:
+        t.join()
+
+    if latencies:
+        ms = sorted(x * 1000 for x in latencies)
+        p95 = ms[int(len(ms) * 0.95) - 1] if len(ms) >= 20 else ms[-1]
+        stats = f"p50={statistics.median(ms):.1f}ms p95={p95:.1f}ms max={ms[-1]:.1f}ms"
+    else:
+        stats = "no reads completed"
+    print(
+        f"{label:<7} write={write_s:.2f}s reads={len(latencies)} "
+        f"({len(latencies) / write_s:.0f}/s) locked={len(errors)} {stats}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=50000, help="rows in the write transaction")
+    parser.add_argument("--seed-rows", type=int, default=5000)
+    parser.add_argument("--hold", type=float, default=1.0, help="seconds the write txn stays open")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_url = f"sqlite:///{os.path.join(tmp, 'legacy.db')}"
+        legacy = create_engine(legacy_url, connect_args={"check_same_thread": False})
+        run("legacy", legacy, legacy, args)
+        legacy.dispose()
+
+        tuned_url = f"sqlite:///{os.path.join(tmp, 'tuned.db')}"
+        tuned_write, tuned_read = make_engine(tuned_url), make_engine(tuned_url, read_only=True)
+        run("tuned", tuned_write, tuned_read, args)
+        tuned_write.dispose()
+        tuned_read.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
 from sqlmodel import SQLModel, Field, create_engine, Session, select
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
 from datetime import datetime
 from typing import Optional
 
@@ -31,19 +34,108 @@ database_url = os.getenv("DATABASE_URL", sqlite_url)
 if database_url.startswith("postgres://"):
     database_url = database_url.replace("postgres://", "postgresql://", 1)
 
-connect_args = {"check_same_thread": False} if "sqlite" in database_url else {}
-engine = create_engine(database_url, echo=False, connect_args=connect_args)
+# Optional read replica; falls back to the primary.
+read_database_url = os.getenv("DATABASE_READ_URL", database_url)
+if read_database_url.startswith("postgres://"):
+    read_database_url = read_database_url.replace("postgres://", "postgresql://", 1)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+# Connection pool tuning. Serverless instances each hold their own pool, so keep these
+# small on Postgres: worst case is instances * (pool_size + max_overflow) connections
+# to the primary (plus the same again to DATABASE_READ_URL, if a replica is set).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; below typical server idle timeouts
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+# Behind PgBouncer (e.g. Vercel/Neon "-pooler" URLs) the bouncer does the pooling;
+# NullPool opens/closes per checkout so idle instances hold no server connections.
+DB_USE_NULLPOOL = _env_bool("DB_USE_NULLPOOL", False)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+def _set_sqlite_pragmas(read_only: bool):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers keep reading the last committed snapshot while the cron writes;
+        # NORMAL sync is durable across app crashes in WAL mode and avoids an fsync per commit.
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return on_connect
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    if not url.startswith("sqlite"):
+        return False
+    database = make_url(url).database
+    return not database or database == ":memory:" or "mode=memory" in url
+
+
+def make_engine(url: str, read_only: bool = False):
+    """Builds an engine with the pool settings above (and WAL pragmas on SQLite)."""
+    if _is_memory_sqlite(url):
+        # Keep SQLAlchemy's SingletonThreadPool (it rejects QueuePool arguments) and
+        # skip the pragmas; WAL doesn't apply to an in-memory database.
+        return create_engine(url, echo=False, connect_args={"check_same_thread": False})
+
+    if url.startswith("sqlite"):
+        new_engine = create_engine(
+            url,
+            echo=False,
+            connect_args={"check_same_thread": False},
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+        event.listen(new_engine, "connect", _set_sqlite_pragmas(read_only))
+        return new_engine
+
+    if DB_USE_NULLPOOL:
+        return create_engine(url, echo=False, poolclass=NullPool)
+
+    return create_engine(
+        url,
+        echo=False,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+
+# Writes (cron, backfill, schema) go through write_engine; API reads through read_engine.
+write_engine = make_engine(database_url)
+# Reads get their own engine only for a real replica, or for file SQLite (query_only
+# connections reading WAL snapshots). Same-URL Postgres shares the write pool so the
+# per-instance connection cap holds; in-memory SQLite is private to its engine anyway.
+if _is_memory_sqlite(read_database_url) or (
+    read_database_url == database_url and not read_database_url.startswith("sqlite")
+):
+    read_engine = write_engine
+else:
+    read_engine = make_engine(read_database_url, read_only=True)
+engine = write_engine  # backwards-compatible alias
 
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+    SQLModel.metadata.create_all(write_engine)
 
 def get_session():
-    with Session(engine) as session:
+    with Session(write_engine) as session:
         yield session
 
 def save_momentum_record(spy: float, veu: float, bnd: float, signal: str, tbill: float = None, region: str = "US"):
     """Saves a momentum record to the database."""
-    with Session(engine) as session:
+    with Session(write_engine) as session:
         record = MomentumHistory(
             region=region,
             spy_mom=spy,
@@ -60,7 +152,7 @@ def save_momentum_record(spy: float, veu: float, bnd: float, signal: str, tbill:
 
 def get_history(region: str = "US", limit: int = 100):
     """Fetches the last N records for a specific region. Default reduced to 100 for performance."""
-    with Session(engine) as session:
+    with Session(read_engine) as session:
         statement = select(MomentumHistory)\
             .where(MomentumHistory.region == region)\
             .order_by(MomentumHistory.date.desc())\
@@ -83,7 +175,7 @@ def get_latest_signal_change(region: str = "US"):
         - previous_signal_duration_days: int
         - no_change_in_history: bool (optional, true if signal never changed)
     """
-    with Session(engine) as session:
+    with Session(read_engine) as session:
         # Query ALL records for the region, sorted by date DESC
         statement = select(MomentumHistory)\
             .where(MomentumHistory.region == region)\